@@ -1,62 +1,121 @@
+import os
 import src.database as db
 from pathlib import Path
 import joblib
+from joblib import Parallel, delayed
 from src.features_extractor import prepare_features
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
 
 MODEL_DIR = Path.cwd() / "models"
 
+_model_cache = {}
 
-def retrain_and_save_models(models):
+
+def load_models(currency_ids):
+    """
+    Returns the models of the given currencies. Models are loaded from disk only on first use
+    and kept in memory for the lifetime of the process.
+
+    Args:
+        currency_ids (Iterable[int]): IDs of the currencies.
+
+    Returns:
+        dict: A dictionary where keys are currency IDs and values are loaded model instances.
+    """
+    for currency_id in currency_ids:
+        if currency_id not in _model_cache:
+            model_path = MODEL_DIR / f'model_{currency_id}.joblib'
+            _model_cache[currency_id] = joblib.load(model_path, mmap_mode='r')
+    return {currency_id: _model_cache[currency_id] for currency_id in currency_ids}
+
+
+def _train_one(currency_id, model, features):
+    """
+    Retrains a single currency model on its full exchange rate history and saves it to disk.
+    The model is written to a temporary file and then moved over the old one, so a file that is
+    still memory-mapped is never truncated and an interrupted dump never leaves a corrupt model.
+
+    Args:
+        currency_id (int): ID of the currency.
+        model: Model instance to retrain.
+        features (pd.DataFrame): Exchange rate history of the currency with extracted features.
+
+    Returns:
+        tuple: Currency ID and the fitted model.
+    """
+    X = features.drop(['value','date'], axis=1).values
+    y = features['value'].values
+    model.fit(X, y)
+    model_path = MODEL_DIR / f'model_{currency_id}.joblib'
+    tmp_path = model_path.with_name(f'{model_path.name}.{os.getpid()}.tmp')
+    try:
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, model_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return currency_id, model
+
+
+def build_features(rates_by_id):
+    """
+    Extracts features from the exchange rate history of every currency. Currencies are processed in parallel.
+
+    Args:
+        rates_by_id (dict): A dictionary where keys are currency IDs and values are DataFrames
+            with their exchange rate history.
+
+    Returns:
+        dict: A dictionary where keys are currency IDs and values are DataFrames with extracted features.
+    """
+    features = Parallel(n_jobs=-1, backend='loky')(
+        delayed(prepare_features)(rates) for rates in rates_by_id.values())
+    return dict(zip(rates_by_id.keys(), features))
+
+
+def retrain_and_save_models(features_by_id, models):
     """
     Retrains each model using the latest historical exchange rate data
-    and saves the updated models to disk.
+    and saves the updated models to disk. Currencies are processed in parallel.
 
     Args:
+        features_by_id (dict): A dictionary where keys are currency IDs and values are DataFrames
+            with extracted features.
         models (dict): A dictionary where keys are currency IDs and values are scikit-learn model instances.
+
+    Returns:
+        dict: A dictionary where keys are currency IDs and values are the retrained models.
     """
-    for currency_id, model in models.items():
-        prev_values = db.return_values("ExchangeRates",
-                                       col="date, value",
-                                       cond=f"WHERE currency_id = {currency_id}")
-        currency_data = pd.DataFrame(prev_values, columns=["date", "value"])
-        currency_data = prepare_features(currency_data)
-        X = currency_data.drop(['value','date'], axis=1).values
-        y = currency_data['value'].values
-        model.fit(X, y)
-        joblib.dump(model, MODEL_DIR / f'model_{currency_id}.joblib')
-
-
-def predict_values(data, models):
+    results = Parallel(n_jobs=-1, backend='loky')(
+        delayed(_train_one)(currency_id, model, features_by_id[currency_id])
+        for currency_id, model in models.items() if currency_id in features_by_id)
+    return dict(results)
+
+
+def predict_values(features_by_id, models):
     """
     Predicts the next exchange rate for each currency using the most recent data
     and the corresponding pre-trained model.
 
     Args:
-        data (pd.DataFrame): DataFrame containing the latest exchange rate entries.
+        features_by_id (dict): A dictionary where keys are currency IDs and values are DataFrames
+            with extracted features.
         models (dict): A dictionary where keys are currency IDs and values are loaded model instances.
 
     Returns:
         pd.DataFrame: DataFrame containing currency IDs and their corresponding predicted values.
     """
-    predictions = []
-    for i in range(len(data)):
-        currency_id = i
-        prev_values = db.return_values("ExchangeRates",
-                                       col="date, value",
-                                       cond=f"WHERE currency_id = {currency_id}")
-        currency_data = pd.DataFrame(prev_values, columns=["date", "value"])
-        currency_data = prepare_features(currency_data)
-
-        currency_data.index = pd.to_datetime(currency_data["date"])
-        X = currency_data.drop(['value', 'date'], axis=1).values
-        if len(X) > 0:
-            prediction = models[currency_id].predict(X[-1].reshape(1, -1))[0]
-            predictions.append((currency_id, prediction))
-
-    currency_ids = [i[0] for i in predictions]
-    predictions = [i[1] for i in predictions]
+    currency_ids = [currency_id for currency_id, currency_data in features_by_id.items()
+                    if currency_id in models and len(currency_data) > 0]
+    if not currency_ids:
+        return pd.DataFrame({"currency_id": [], "prediction": []})
+
+    last_rows = pd.concat([features_by_id[currency_id].iloc[-1:] for currency_id in currency_ids])
+    X_last = last_rows.drop(['value', 'date'], axis=1).to_numpy(dtype=float)
+    predictions = np.fromiter((models[currency_id].predict(X_last[i:i + 1])[0]
+                               for i, currency_id in enumerate(currency_ids)),
+                              dtype=float, count=len(currency_ids))
     prediction_df = pd.DataFrame({"currency_id": currency_ids, "prediction": predictions})
     return prediction_df
 
@@ -64,24 +123,28 @@ def predict_values(data, models):
 def main():
     """
     Main pipeline function:
+    - Ensures the database indexes exist.
     - Loads today's exchange rate data from the database.
     - Loads pre-trained models for each currency.
+    - Extracts features once per currency, shared by prediction and retraining.
     - Predicts tomorrow’s exchange rates and inserts them into the database.
-    - Retrains models using the most recent data and saves them.
+    - Retrains models using the most recent data, saves them and keeps them cached for the next run.
     """
+    db.indexes_creator()
     currency_df = db.exchange_rates_insert()
     date = currency_df.loc[0, "date"]
-    models = {}
-    for i in range(len(currency_df)):
-        currency_id = i
-        model_path = MODEL_DIR / f'model_{i}.joblib'
-        models[currency_id] = joblib.load(model_path)
+    models = load_models(range(len(currency_df)))
+
+    rates = db.return_all_rates()
+    rates_by_id = {currency_id: group.drop(columns="currency_id").reset_index(drop=True)
+                   for currency_id, group in rates.groupby("currency_id")}
+    features_by_id = build_features(rates_by_id)
 
     # predictions for tommorow
-    prediction_df = predict_values(currency_df, models)
-    tomorrow = (datetime.strptime(date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+    prediction_df = predict_values(features_by_id, models)
+    tomorrow = (pd.Timestamp(date) + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
     db.predictions_insert(prediction_df, tomorrow)
-    retrain_and_save_models(models)
+    _model_cache.update(retrain_and_save_models(features_by_id, models))
 
 
 if __name__ == "__main__":
@@ -1,6 +1,18 @@
+import functools
 import requests
 import pandas as pd
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+MAX_WORKERS = 32
+REQUEST_TIMEOUT = 30
+
+_session = requests.Session()
+_session.mount('http://', HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS,
+                                      max_retries=Retry(total=5, backoff_factor=1,
+                                                        status_forcelist=(429, 500, 502, 503, 504))))
 
 
 def currency_json_to_df(json_data):
@@ -13,51 +25,84 @@ def currency_json_to_df(json_data):
     Returns:
         pd.DataFrame: DataFrame with columns [name, code, value, date] representing currency information.
     """
-    currencies_df = pd.DataFrame(columns=["name", "code", "value"])
-    for currency in json_data["rates"]:
-        n = len(currencies_df)
-        currencies_df.loc[n, "name"] = currency['currency']
-        currencies_df.loc[n, "code"] = currency['code']
-        currencies_df.loc[n, "value"] = currency['mid']
+    rows = [{"name": currency['currency'], "code": currency['code'], "value": currency['mid']}
+            for currency in json_data["rates"]]
+    currencies_df = pd.DataFrame.from_records(rows, columns=["name", "code", "value"])
     currencies_df["date"] = json_data["effectiveDate"]
     return currencies_df
 
 
-def current_currencies_values():
+@functools.lru_cache(maxsize=1)
+def _current_snapshot(day):
     """
-    Retrieves the latest currency exchange rates from the NBP API (tables 'a' and 'b').
+    Downloads the latest exchange rates of tables 'a' and 'b'. The result is cached per day.
+
+    Args:
+        day (date): Day of the snapshot, used only as the cache key.
 
     Returns:
         pd.DataFrame: Combined DataFrame with current exchange rates and source table label.
     """
-    currency_df = None
+    frames = []
     for table in ["a", "b"]:
-        response = requests.get(f'http://api.nbp.pl/api/exchangerates/tables/{table}?format=json')
+        response = _session.get(f'http://api.nbp.pl/api/exchangerates/tables/{table}?format=json',
+                                timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
         currency_df_temp = currency_json_to_df(response.json()[0])
         currency_df_temp["table"] = table
-        currency_df = pd.concat([currency_df, currency_df_temp])
-    return currency_df.reset_index(drop=True)
+        frames.append(currency_df_temp)
+    return pd.concat(frames, ignore_index=True)
+
+
+def current_currencies_values():
+    """
+    Retrieves the latest currency exchange rates from the NBP API (tables 'a' and 'b').
+    The API is queried once per day; later calls on the same day reuse the downloaded snapshot.
+
+    Returns:
+        pd.DataFrame: Combined DataFrame with current exchange rates and source table label.
+    """
+    return _current_snapshot(date.today()).copy()
+
+
+def _fetch_table_day(table, day):
+    """
+    Downloads exchange rates of a single NBP table for a single day.
+
+    Args:
+        table (str): NBP table label ('a' or 'b').
+        day (pd.Timestamp): Day to download.
+
+    Returns:
+        pd.DataFrame | None: DataFrame with the day's exchange rates, or None if the table
+        was not published that day.
+    """
+    response = _session.get(f'http://api.nbp.pl/api/exchangerates/tables/{table}/{day.date()}/?format=json',
+                            timeout=REQUEST_TIMEOUT)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    df_day = currency_json_to_df(response.json()[0])
+    df_day["table"] = table
+    return df_day
 
 
 def historical_currencies_values():
     """
     Downloads historical currency exchange rates from the NBP API (tables 'a' and 'b'),
-    starting from 2023-01-01 up to yesterday.
+    starting from 2023-01-01 up to yesterday. Days are requested concurrently.
 
     Returns:
         pd.DataFrame: Combined DataFrame with historical exchange rates and their respective table labels.
     """
     yesterday = datetime.today() - timedelta(days=1)
     date_range = pd.date_range(start="2023-01-01", end=yesterday.strftime('%Y-%m-%d'))
-    historical_df = pd.DataFrame(columns=["name", "code", "value", "table"])
-    for table in ["a", "b"]:
-        for day in date_range:
-            response = requests.get(f'http://api.nbp.pl/api/exchangerates/tables/{table}/{day.date()}/?format=json')
-            if response.status_code == 404:
-                continue
-            df_day = currency_json_to_df(response.json()[0])
-            df_day["table"] = table
-            historical_df = pd.concat([historical_df, df_day])
-    return historical_df.reset_index(drop=True)
+    requests_args = [(table, day) for table in ["a", "b"] for day in date_range]
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        results = executor.map(lambda args: _fetch_table_day(*args), requests_args)
+        frames = [df_day for df_day in results if df_day is not None]
+    if not frames:
+        return pd.DataFrame(columns=["name", "code", "value", "date", "table"])
+    return pd.concat(frames, ignore_index=True)
 
 
@@ -1,8 +1,42 @@
+import atexit
+import os
 import sqlite3
 import src.currency_scrapper as curr_scrap
 import pandas as pd
 from pathlib import Path
 
+DB_PATH = 'currencies.db'
+
+_conn = None
+_conn_pid = None
+
+
+def _get_conn():
+    """
+    Returns the SQLite connection shared by all database helpers, opening it on first use.
+    A separate connection is opened in every process, since connections cannot be shared
+    between processes (e.g. joblib workers).
+
+    Returns:
+        sqlite3.Connection: Open database connection.
+    """
+    global _conn, _conn_pid
+    if _conn is None or _conn_pid != os.getpid():
+        _conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        _conn.execute('PRAGMA journal_mode=WAL')
+        _conn.execute('PRAGMA synchronous=NORMAL')
+        _conn.execute('PRAGMA temp_store=MEMORY')
+        _conn.execute('PRAGMA cache_size=-64000')
+        _conn_pid = os.getpid()
+    return _conn
+
+
+@atexit.register
+def _close_conn():
+    """Closes the shared connection of the current process, if it was opened."""
+    if _conn is not None and _conn_pid == os.getpid():
+        _conn.close()
+
 
 def check_table_exists(table_name):
     """
@@ -14,16 +48,13 @@ def check_table_exists(table_name):
     Returns:
         bool: True if the table exists, False otherwise.
     """
-    conn = sqlite3.connect('currencies.db')
-    cursor = conn.cursor()
+    cursor = _get_conn().cursor()
     cursor.execute("""
         SELECT name 
         FROM sqlite_master 
         WHERE type='table' AND name=?
     """, (table_name,))
-    result = cursor.fetchone() is not None
-    conn.close()
-    return result
+    return cursor.fetchone() is not None
 
 
 def check_num_of_records(table_name):
@@ -36,12 +67,9 @@ def check_num_of_records(table_name):
     Returns:
         int: Number of records.
     """
-    conn = sqlite3.connect('currencies.db')
-    cursor = conn.cursor()
+    cursor = _get_conn().cursor()
     cursor.execute(f'SELECT COUNT(*) FROM {table_name}')
-    result = cursor.fetchone()
-    conn.close()
-    return result[0]
+    return cursor.fetchone()[0]
 
 
 def check_table_empty(table_name):
@@ -57,28 +85,40 @@ def check_table_empty(table_name):
     return check_num_of_records(table_name) == 0
 
 
-def return_values(table_name, col="*", cond=""):
+def return_values(table_name, col="*", cond="", params=()):
     """
     Returns data from a given table with optional column selection and condition.
+    Values used in the condition should be passed as `?` placeholders bound through `params`,
+    so SQLite can reuse the prepared statement.
 
     Args:
         table_name (str): Table name.
         col (str): Columns to retrieve (default "*").
         cond (str): SQL condition (default "").
+        params (tuple): Values bound to `?` placeholders in the condition (default ()).
 
     Returns:
         list: Retrieved rows, flattened if single column is selected.
     """
-    conn = sqlite3.connect('currencies.db')
-    cursor = conn.cursor()
-    cursor.execute(f'SELECT {col} FROM {table_name} {cond}')
+    cursor = _get_conn().cursor()
+    cursor.execute(f'SELECT {col} FROM {table_name} {cond}', params)
     result = cursor.fetchall()
     if col != "*" and "," not in col:
         result = [res[0] for res in result]
-    conn.close()
     return result if result is not None else []
 
 
+def return_all_rates():
+    """
+    Returns the whole exchange rate history of all currencies in a single query.
+
+    Returns:
+        pd.DataFrame: DataFrame with columns [currency_id, date, value] ordered by currency and date.
+    """
+    return pd.read_sql_query('SELECT currency_id, date, value FROM ExchangeRates ORDER BY currency_id, date',
+                             _get_conn(), dtype={"currency_id": "int64", "value": "float64"})
+
+
 def drop_table(table_name):
     """
     Drops a table from the database if it exists.
@@ -86,11 +126,9 @@ def drop_table(table_name):
     Args:
         table_name (str): Table name.
     """
-    conn = sqlite3.connect('currencies.db')
-    cursor = conn.cursor()
-    cursor.execute(f'DROP TABLE IF EXISTS {table_name}')
-    conn.commit()
-    conn.close()
+    conn = _get_conn()
+    with conn:
+        conn.execute(f'DROP TABLE IF EXISTS {table_name}')
 
 
 def create_table(table_name, cols, col_types):
@@ -102,17 +140,43 @@ def create_table(table_name, cols, col_types):
         cols (list): Column names.
         col_types (list): Corresponding column types.
     """
-    conn = sqlite3.connect('currencies.db')
-    cursor = conn.cursor()
+    conn = _get_conn()
     query = ", ".join([f"{col} {col_type}" for col, col_type in zip(cols, col_types)])
-    cursor.execute(f'CREATE TABLE {table_name}({query})')
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute(f'CREATE TABLE {table_name}({query})')
+
+
+def create_index(index_name, table_name, cols):
+    """
+    Creates an index on the given columns of a table if it doesn't exist.
+
+    Args:
+        index_name (str): Index name.
+        table_name (str): Table name.
+        cols (list): Indexed column names.
+    """
+    conn = _get_conn()
+    with conn:
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {index_name} ON {table_name}({", ".join(cols)})')
+
+
+def indexes_creator():
+    """
+    Creates the indexes used by the pipeline's lookups on every existing table that lacks them.
+    Safe to call on every run, so databases created before the indexes were introduced get them too.
+    """
+    if check_table_exists("Currencies"):
+        create_index("idx_currencies_name", "Currencies", ["name"])
+    if check_table_exists("ExchangeRates"):
+        create_index("idx_er_cid_date", "ExchangeRates", ["currency_id", "date"])
+    if check_table_exists("Predictions"):
+        create_index("idx_predictions_cid_date", "Predictions", ["currency_id", "date"])
 
 
 def table_creator():
     """
-    Creates required database tables (Currencies, ExchangeRates, Predictions) if they don't exist.
+    Creates required database tables (Currencies, ExchangeRates, Predictions) and their indexes
+    if they don't exist.
     """
     if not check_table_exists("Currencies"):
         create_table("Currencies",
@@ -129,6 +193,8 @@ def table_creator():
                      ["prediction_id", "currency_id", "date", "value"],
                      ["INTEGER", "INTEGER", "DATE", "FLOAT"])
 
+    indexes_creator()
+
 
 def currencies_insert():
     """
@@ -136,8 +202,7 @@ def currencies_insert():
     along with RMAPE scores loaded from a CSV file.
     """
     if check_table_empty("Currencies"):
-        conn = sqlite3.connect('currencies.db')
-        cursor = conn.cursor()
+        conn = _get_conn()
         query = '''INSERT INTO Currencies("currency_id", "name", "code", "rmape", "table_val") VALUES (?, ?, ?, ?, ?)'''
 
         currencies_df = curr_scrap.current_currencies_values()
@@ -148,16 +213,15 @@ def currencies_insert():
                         currencies_df["code"],
                         rmape["rmape"],
                         currencies_df["table"]))
-        cursor.executemany(query, data)
-        conn.commit()
-        conn.close()
+        with conn:
+            conn.executemany(query, data)
 
 
 def exchange_rates_insert(initial=False):
     """
     Inserts exchange rates into the ExchangeRates table.
     If `initial` is True, fetches historical data; otherwise, fetches current data.
-    Skips records already present in the database.
+    Skips records whose currency and date are already present in the database.
 
     Args:
         initial (bool): Whether to fetch historical data (True) or current data (False).
@@ -165,24 +229,20 @@ def exchange_rates_insert(initial=False):
     Returns:
         pd.DataFrame: DataFrame of inserted records.
     """
-    conn = sqlite3.connect('currencies.db')
-    cursor = conn.cursor()
-    values_in_db = return_values("ExchangeRates", "currency_id")
+    conn = _get_conn()
+    values_in_db = set(return_values("ExchangeRates", "currency_id, date"))
+    currencies = pd.read_sql_query('SELECT name, currency_id FROM Currencies', conn).drop_duplicates("name")
 
-    query = '''INSERT INTO ExchangeRates("rate_id", "currency_id", "date", "value") VALUES (?, ?, ?, ?)'''
     df = curr_scrap.historical_currencies_values() if initial else curr_scrap.current_currencies_values()
 
-    data = []
-    for idx in range(len(df)):
-        name_val = df.loc[idx, "name"]
-        cursor.execute(f'SELECT currency_id FROM "Currencies" WHERE name="{name_val}"')
-        result = cursor.fetchone()
-        if result is not None: 
-            if result[0] not in values_in_db:
-                data.insert(idx, (idx, result[0], df.loc[idx, "date"], df.loc[idx, "value"]))
-    cursor.executemany(query, data)
-    conn.commit()
-    conn.close()
+    rates = df[["name", "date", "value"]].reset_index(drop=True)
+    rates["rate_id"] = rates.index
+    rates = rates.merge(currencies, on="name")
+    is_new = pd.Series([key not in values_in_db for key in zip(rates["currency_id"], rates["date"])],
+                       index=rates.index, dtype=bool)
+    rates = rates[is_new]
+    rates = rates[["rate_id", "currency_id", "date", "value"]]
+    rates.to_sql("ExchangeRates", conn, if_exists="append", index=False, method="multi", chunksize=500)
     return df
 
 
@@ -194,17 +254,15 @@ def predictions_insert(predictions_df, tomorrow):
         predictions_df (pd.DataFrame): DataFrame with prediction results.
         tomorrow (str): Date for which predictions are made (in YYYY-MM-DD format).
     """
-    conn = sqlite3.connect('currencies.db')
-    cursor = conn.cursor()
+    conn = _get_conn()
 
     query = '''INSERT INTO Predictions("prediction_id", "currency_id", "date", "value") VALUES (?, ?, ?, ?)'''
-    data = list(zip(range(len(predictions_df)),
-                    predictions_df["currency_id"],
-                    [tomorrow] * len(predictions_df),
-                    predictions_df["prediction"]))
-    cursor.executemany(query, data)
-    conn.commit()
-    conn.close()
+    data = ((idx, currency_id, tomorrow, prediction)
+            for idx, (currency_id, prediction) in enumerate(zip(predictions_df["currency_id"],
+                                                                predictions_df["prediction"])))
+    with conn:
+        conn.execute("BEGIN")
+        conn.executemany(query, data)
 
 
 def database_init_pipeline():
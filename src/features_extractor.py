@@ -1,80 +1,68 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 from statsmodels.tsa.seasonal import STL as STL
 
 
-def shift_feature(data, shifts):
+def _shift(values, periods):
     """
-    Adds lagged versions of the 'value' column to the DataFrame.
+    Shifts an array forward by the given number of positions, padding the start with NaN.
 
     Args:
-        data (pd.DataFrame): Input time series data.
-        shifts (list[int]): List of lag intervals to shift by.
-    """
-    for shift in shifts:
-        data[f"shift_{shift}"] = data["value"].shift(shift)
+        values (np.ndarray): Input values.
+        periods (int): Number of positions to shift by.
 
-
-def mean_rolling(data, window_sizes):
-    """
-    Adds rolling mean features based on the 'value' column shifted by 1.
-
-    Args:
-        data (pd.DataFrame): Input time series data.
-        window_sizes (list[int]): List of window sizes for rolling means.
-    """
-    for window in window_sizes:
-        data[f"rolling_{window}_mean"] = data["value"].shift(1).rolling(window=window).mean()
-
-
-def std_rolling(data, window_sizes):
-    """
-    Adds rolling standard deviation features based on the 'value' column shifted by 1.
-
-    Args:
-        data (pd.DataFrame): Input time series data.
-        window_sizes (list[int]): List of window sizes for rolling std.
+    Returns:
+        np.ndarray: Shifted values.
     """
-    for window in window_sizes:
-        data[f"rolling_{window}_std"] = data["value"].shift(1).rolling(window=window).std()
+    shifted = np.full(len(values), np.nan)
+    shifted[periods:] = values[:max(len(values) - periods, 0)]
+    return shifted
 
 
-def shifted_diff(data, num_lags):
+def _build_features(values, shifts, window_sizes, num_lags):
     """
-    Adds lagged difference features for the 'value' column.
+    Computes the lag, rolling window, lagged difference and expanding mean features
+    directly from the numpy array of values, without intermediate pandas objects.
 
     Args:
-        data (pd.DataFrame): Input time series data.
+        values (np.ndarray): Input time series values.
+        shifts (list[int]): List of lag intervals to shift by.
+        window_sizes (list[int]): List of window sizes for rolling mean and std.
         num_lags (int): Number of lag differences to compute.
-    """
-    for i in range(1, num_lags + 1):
-        data[f'value_lag_{i}'] = data["value"].diff(periods=i)
 
-
-def stl_components(data):
-    """
-    Decomposes the 'value' series using STL and adds trend, seasonal, and residual components.
-
-    Args:
-        data (pd.DataFrame): Input time series data.
+    Returns:
+        dict: Feature names mapped to arrays of the same length as `values`.
     """
-    stl = STL(data["value"], period=10).fit()
-    data["trend"] = stl.trend
-    data["seasonal"] = stl.seasonal
-    data["resid"] = stl.resid
+    n = len(values)
+    shifted = _shift(values, 1)
+    features = {f"shift_{shift}": _shift(values, shift) for shift in shifts}
 
+    means, stds = {}, {}
+    for window in window_sizes:
+        means[window] = np.full(n, np.nan)
+        stds[window] = np.full(n, np.nan)
+        if n >= window:
+            windows = sliding_window_view(shifted, window)
+            means[window][window - 1:] = windows.mean(axis=1)
+            stds[window][window - 1:] = windows.std(axis=1, ddof=1)
+    features.update({f"rolling_{window}_mean": means[window] for window in window_sizes})
+    features.update({f"rolling_{window}_std": stds[window] for window in window_sizes})
 
-def expanding_window(data):
-    """
-    Adds expanding mean of the 'value' column (shifted by 1).
+    for i in range(1, num_lags + 1):
+        features[f'value_lag_{i}'] = values - _shift(values, i)
 
-    Args:
-        data (pd.DataFrame): Input time series data.
-    """
-    data[f"expanding_mean_1"] = data["value"].shift(1).expanding().mean()
+    expanding_mean = np.full(n, np.nan)
+    expanding_mean[1:] = np.cumsum(values)[:-1] / np.arange(1, n)
+    features["expanding_mean_1"] = expanding_mean
+    return features
 
 
 def prepare_features(data):
     """
-    Applies all feature extraction steps to the input DataFrame.
+    Extracts all features from the 'value' column of the input DataFrame: lags, rolling means
+    and standard deviations of the values shifted by 1, lagged differences, STL trend, seasonal
+    and residual components, and the expanding mean of the values shifted by 1.
 
     Args:
         data (pd.DataFrame): Input time series data.
@@ -82,10 +70,9 @@ def prepare_features(data):
     Returns:
         pd.DataFrame: DataFrame with extracted features.
     """
-    shift_feature(data, [1, 2])
-    mean_rolling(data, [2, 3])
-    std_rolling(data, [2, 3])
-    shifted_diff(data, 2)
-    stl_components(data)
-    expanding_window(data)
-    return data
+    values = data["value"].to_numpy(dtype=float)
+    features = _build_features(values, [1, 2], [2, 3], 2)
+    expanding_mean = features.pop("expanding_mean_1")
+    stl = STL(values, period=10).fit()
+    features.update(trend=stl.trend, seasonal=stl.seasonal, resid=stl.resid, expanding_mean_1=expanding_mean)
+    return pd.concat([data, pd.DataFrame(features, index=data.index)], axis=1)